@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Export the final estimator of the prediction pipeline to ONNX.
+The API loads models/bitcoin_prediction_model.onnx on startup when onnxruntime is installed
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+import numpy as np
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+import main
+
+def export_onnx_model():
+    """Convert the pipeline's final estimator and check it against scikit-learn"""
+    print("🚀 Exporting prediction model to ONNX")
+    print("=" * 60)
+    
+    if not main.load_model():
+        print("❌ Could not load the joblib pipeline, nothing to export")
+        return False
+    
+    model = main.loaded_pipeline.named_steps['model']
+    
+    # The API feeds the model a float32 matrix with the features in FINAL_FEATURES order
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[('input', FloatTensorType([None, len(main.FINAL_FEATURES)]))]
+    )
+    main.ONNX_MODEL_PATH.write_bytes(onnx_model.SerializeToString())
+    print(f"✅ ONNX model written to {main.ONNX_MODEL_PATH}")
+    
+    # Compare both runtimes on random standardized inputs
+    if not main.load_onnx_model():
+        return False
+    
+    rng = np.random.default_rng(seed=0)
+    features = rng.normal(size=(1000, len(main.FINAL_FEATURES))).astype(np.float32)
+    sklearn_pred = model.predict(features)
+    onnx_pred = main.onnx_session.run(None, {'input': features})[0][:, 0]
+    
+    print(f"📊 Max absolute difference vs scikit-learn: {np.abs(sklearn_pred - onnx_pred).max():.6f}")
+    return True
+
+if __name__ == "__main__":
+    export_onnx_model()
@@ -4,8 +4,139 @@ Test script for CoinGecko API integration
 Tests fetching market cap data from CoinGecko for specific dates
 """
 
+import asyncio
+import functools
+import httpx
+import orjson
 import requests
-from datetime import datetime, timedelta
+import requests_cache
+from loguru import logger
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared session so repeated CoinGecko calls reuse pooled keep-alive connections.
+# Responses are cached in the user cache directory: past-dated history never changes,
+# prices go stale after 5 minutes
+_SESSION = requests_cache.CachedSession(
+    'coingecko_cache',
+    use_cache_dir=True,
+    expire_after=timedelta(days=365),
+    urls_expire_after={
+        'api.coingecko.com/api/v3/coins/*/history': requests_cache.NEVER_EXPIRE,
+        'api.coingecko.com/api/v3/simple/price': timedelta(minutes=5),
+    },
+    allowable_codes=[200]
+)
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504],
+        # Keep retries on the short backoff rather than sleeping for the Retry-After header
+        respect_retry_after_header=False
+    )
+))
+
+COINGECKO_HIST = "https://api.coingecko.com/api/v3/coins/bitcoin/history"
+
+# Skip the per-language name block CoinGecko includes in history responses by default
+COINGECKO_HIST_PARAMS = "localization=false"
+
+@functools.lru_cache(maxsize=512)
+def fmt_cg(d):
+    """Format a date the way CoinGecko expects it (dd-mm-yyyy)"""
+    return d.strftime("%d-%m-%Y")
+
+# Keep concurrent CoinGecko requests under the free-tier rate limit
+MAX_CONCURRENT_REQUESTS = 5
+MAX_ATTEMPTS = 3
+# Longest Retry-After wait honoured, in seconds
+MAX_RETRY_AFTER = 60
+
+def retry_after_seconds(retry_after):
+    """Parse a Retry-After header (delay in seconds or an HTTP date), capped at MAX_RETRY_AFTER"""
+    try:
+        delay = float(retry_after)
+    except ValueError:
+        try:
+            delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            delay = 0
+    return min(max(delay, 0), MAX_RETRY_AFTER)
+
+async def fetch_one(client, date_str, semaphore):
+    """Fetch CoinGecko history for one dd-mm-yyyy date, returning (status, data or error text)"""
+    url = f"{COINGECKO_HIST}?date={date_str}&{COINGECKO_HIST_PARAMS}"
+    
+    async with semaphore:
+        for attempt in range(MAX_ATTEMPTS):
+            response = await client.get(url)
+            if response.status_code == 200:
+                return response.status_code, orjson.loads(response.content)
+            
+            # Back off for as long as the server asks before retrying a rate-limited request
+            retry_after = response.headers.get('Retry-After')
+            if response.status_code != 429 or retry_after is None or attempt == MAX_ATTEMPTS - 1:
+                return response.status_code, response.text
+            
+            await asyncio.sleep(retry_after_seconds(retry_after))
+
+async def fetch_all(date_strs):
+    """Fetch CoinGecko history for all dates concurrently, multiplexed over one HTTP/2 connection"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    
+    async with httpx.AsyncClient(http2=True, timeout=15) as client:
+        return await asyncio.gather(
+            *(fetch_one(client, date_str, semaphore) for date_str in date_strs),
+            return_exceptions=True
+        )
+
+# Market caps already fetched, keyed on the dd-mm-yyyy date
+_MARKET_CAP_MEMO = {}
+
+def fetch_market_cap_from_coingecko(date_ddmmyyyy: str) -> float | None:
+    """
+    Simulate the function from main.py.
+    Memoized on the formatted dd-mm-yyyy date, so repeated dates skip the round trip.
+    Failed lookups (None) are not memoized so they are retried on the next call
+    """
+    cached = _MARKET_CAP_MEMO.get(date_ddmmyyyy)
+    if cached is not None:
+        return cached
+    
+    try:
+        url = f"{COINGECKO_HIST}?date={date_ddmmyyyy}&{COINGECKO_HIST_PARAMS}"
+        
+        print(f"🔄 Fetching market cap from CoinGecko for date: {date_ddmmyyyy}")
+        print(f"🌐 CoinGecko URL: {url}")
+        
+        response = _SESSION.get(url, timeout=15)
+        
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            
+            if 'market_data' in data and 'market_cap' in data['market_data']:
+                market_cap_usd = data['market_data']['market_cap'].get('usd')
+                if market_cap_usd:
+                    market_cap = float(market_cap_usd)
+                    print(f"✅ CoinGecko market cap: ${market_cap:,.0f}")
+                    _MARKET_CAP_MEMO[date_ddmmyyyy] = market_cap
+                    return market_cap
+                else:
+                    print("⚠️ Market cap USD not found in CoinGecko response")
+            else:
+                print("⚠️ Market data not found in CoinGecko response")
+        else:
+            print(f"⚠️ CoinGecko API returned status code: {response.status_code}")
+            
+    except requests.RequestException as e:
+        print(f"⚠️ CoinGecko API request failed: {e}")
+    except Exception as e:
+        print(f"⚠️ Error processing CoinGecko data: {e}")
+    
+    return None
 
 def test_coingecko_api_direct():
     """Test direct CoinGecko API call"""
@@ -19,48 +150,52 @@ def test_coingecko_api_direct():
         "01-01-2024"   # Start of year
     ]
     
-    for date_str in test_dates:
+    # Fetch all dates concurrently, then report the results in order
+    results = asyncio.run(fetch_all(test_dates))
+    
+    for date_str, result in zip(test_dates, results):
         try:
-            url = f"https://api.coingecko.com/api/v3/coins/bitcoin/history?date={date_str}"
+            url = f"{COINGECKO_HIST}?date={date_str}&{COINGECKO_HIST_PARAMS}"
             
-            print(f"\n📅 Testing date: {date_str}")
-            print(f"🌐 URL: {url}")
+            logger.debug("📅 Testing date: {}", date_str)
+            logger.debug("🌐 URL: {}", url)
             
-            response = requests.get(url, timeout=15)
+            if isinstance(result, Exception):
+                raise result
             
-            if response.status_code == 200:
-                data = response.json()
-                
+            status_code, data = result
+            
+            if status_code == 200:
                 if 'market_data' in data and 'market_cap' in data['market_data']:
                     market_cap_usd = data['market_data']['market_cap'].get('usd')
                     
                     if market_cap_usd:
-                        print(f"✅ Success!")
-                        print(f"   Market Cap (USD): ${market_cap_usd:,.0f}")
+                        logger.debug("✅ Success!")
+                        logger.debug("   Market Cap (USD): ${:,.0f}", market_cap_usd)
                         
                         # Show other available data
                         current_price = data['market_data'].get('current_price', {}).get('usd')
                         total_volume = data['market_data'].get('total_volume', {}).get('usd')
                         
                         if current_price:
-                            print(f"   Current Price (USD): ${current_price:,.2f}")
+                            logger.debug("   Current Price (USD): ${:,.2f}", current_price)
                         if total_volume:
-                            print(f"   Total Volume (USD): ${total_volume:,.0f}")
+                            logger.debug("   Total Volume (USD): ${:,.0f}", total_volume)
                             
                     else:
-                        print("❌ Market cap USD not found in response")
+                        logger.warning("❌ Market cap USD not found in response")
                 else:
-                    print("❌ Market data not found in response")
-                    print(f"   Available keys: {list(data.keys())}")
+                    logger.warning("❌ Market data not found in response")
+                    logger.opt(lazy=True).debug("   Available keys: {}", lambda: list(data.keys()))
                     
-            elif response.status_code == 429:
-                print("⚠️ Rate limited by CoinGecko API")
+            elif status_code == 429:
+                logger.warning("⚠️ Rate limited by CoinGecko API")
             else:
-                print(f"❌ HTTP Error: {response.status_code}")
-                print(f"   Response: {response.text[:200]}")
+                logger.warning("❌ HTTP Error: {}", status_code)
+                logger.opt(lazy=True).debug("   Response: {}", lambda: data[:200])
                 
         except Exception as e:
-            print(f"❌ Exception for date {date_str}: {e}")
+            logger.warning("❌ Exception for date {}: {}", date_str, e)
 
 def test_coingecko_with_datetime():
     """Test CoinGecko with datetime objects (like in our code)"""
@@ -75,31 +210,33 @@ def test_coingecko_with_datetime():
         datetime.now() - timedelta(days=7)  # Last week
     ]
     
-    for target_date in test_dates:
+    # Format dates for CoinGecko (dd-mm-yyyy) and fetch them concurrently
+    coingecko_dates = [fmt_cg(target_date) for target_date in test_dates]
+    results = asyncio.run(fetch_all(coingecko_dates))
+    
+    for target_date, coingecko_date, result in zip(test_dates, coingecko_dates, results):
         try:
-            # Format date for CoinGecko (dd-mm-yyyy)
-            coingecko_date = target_date.strftime("%d-%m-%Y")
-            url = f"https://api.coingecko.com/api/v3/coins/bitcoin/history?date={coingecko_date}"
+            url = f"{COINGECKO_HIST}?date={coingecko_date}&{COINGECKO_HIST_PARAMS}"
             
             print(f"\n📅 Testing datetime: {target_date}")
             print(f"📅 Formatted for CoinGecko: {coingecko_date}")
             print(f"🌐 URL: {url}")
             
-            response = requests.get(url, timeout=15)
+            if isinstance(result, Exception):
+                raise result
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                market_cap_data = data.get('market_data', {}).get('market_cap', {})
-                market_cap_usd = market_cap_data.get('usd')
+            status_code, data = result
+            
+            if status_code == 200:
+                # Extract only the two values used below
+                md = data.get('market_data') or {}
+                market_cap_usd = (md.get('market_cap') or {}).get('usd')
+                price_usd = (md.get('current_price') or {}).get('usd')
                 
                 if market_cap_usd:
                     print(f"✅ Market Cap: ${market_cap_usd:,.0f}")
                     
                     # Calculate circulating supply if price is available
-                    price_data = data.get('market_data', {}).get('current_price', {})
-                    price_usd = price_data.get('usd')
-                    
                     if price_usd:
                         circulating_supply = market_cap_usd / price_usd
                         print(f"   Price: ${price_usd:,.2f}")
@@ -108,7 +245,7 @@ def test_coingecko_with_datetime():
                     print("❌ Failed to get market cap")
                     
             else:
-                print(f"❌ HTTP Error: {response.status_code}")
+                print(f"❌ HTTP Error: {status_code}")
                 
         except Exception as e:
             print(f"❌ Exception: {e}")
@@ -119,45 +256,11 @@ def test_api_integration_simulation():
     print("🔍 Simulating Integration with Main API Code")
     print("=" * 60)
     
-    def fetch_market_cap_from_coingecko(target_date):
-        """Simulate the function from main.py"""
-        try:
-            coingecko_date = target_date.strftime("%d-%m-%Y")
-            url = f"https://api.coingecko.com/api/v3/coins/bitcoin/history?date={coingecko_date}"
-            
-            print(f"🔄 Fetching market cap from CoinGecko for date: {coingecko_date}")
-            print(f"🌐 CoinGecko URL: {url}")
-            
-            response = requests.get(url, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if 'market_data' in data and 'market_cap' in data['market_data']:
-                    market_cap_usd = data['market_data']['market_cap'].get('usd')
-                    if market_cap_usd:
-                        market_cap = float(market_cap_usd)
-                        print(f"✅ CoinGecko market cap: ${market_cap:,.0f}")
-                        return market_cap
-                    else:
-                        print("⚠️ Market cap USD not found in CoinGecko response")
-                else:
-                    print("⚠️ Market data not found in CoinGecko response")
-            else:
-                print(f"⚠️ CoinGecko API returned status code: {response.status_code}")
-                
-        except requests.RequestException as e:
-            print(f"⚠️ CoinGecko API request failed: {e}")
-        except Exception as e:
-            print(f"⚠️ Error processing CoinGecko data: {e}")
-        
-        return None
-    
     # Test the function
     test_date = datetime(2024, 10, 25)  # Your example date
     
     print(f"\n🎯 Testing with date: {test_date}")
-    market_cap = fetch_market_cap_from_coingecko(test_date)
+    market_cap = fetch_market_cap_from_coingecko(fmt_cg(test_date))
     
     if market_cap:
         print(f"\n✅ Integration Test Successful!")
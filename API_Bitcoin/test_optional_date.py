@@ -5,18 +5,36 @@ Test script to verify the updated prediction endpoint with optional date paramet
 
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def test_prediction_without_date():
-    """Test the prediction endpoint without providing a date"""
+PREDICT_URL = "http://localhost:8000/predict/Bitcoin"
+TEST_DATE = "2024-10-25"
+
+# Shared session so the concurrent test cases reuse keep-alive connections
+_SESSION = requests.Session()
+
+def run_case(params) -> dict:
+    """Call the prediction endpoint with the given query parameters"""
+    try:
+        response = _SESSION.get(PREDICT_URL, params=params, timeout=30)
+        return {'url': response.url, 'response': response}
+    except requests.RequestException as e:
+        # The failed request still carries the URL that was sent
+        url = e.request.url if e.request is not None else PREDICT_URL
+        return {'url': url, 'error': e}
+
+def report_without_date(result):
+    """Report the prediction endpoint without providing a date"""
     try:
         # Test the endpoint without date parameter
-        url = "http://localhost:8000/predict/Bitcoin"
-        
         print("🔄 Testing prediction endpoint without date parameter...")
-        print(f"🌐 URL: {url}")
+        print(f"🌐 URL: {result['url']}")
+        
+        if 'error' in result:
+            raise result['error']
         
-        response = requests.get(url, timeout=30)
+        response = result['response']
         
         if response.status_code == 200:
             data = response.json()
@@ -30,26 +48,26 @@ def test_prediction_without_date():
                 print(f"✅ Correctly used today's date: {today}")
             else:
                 print(f"⚠️ Expected today's date ({today}) but got: {data.get('input_date')}")
-                
+        
         else:
             print(f"❌ API returned status code: {response.status_code}")
             print(f"Response: {response.text}")
-            
+    
     except requests.RequestException as e:
         print(f"❌ Request failed: {e}")
     except Exception as e:
         print(f"❌ Error: {e}")
 
-def test_prediction_with_date():
-    """Test the prediction endpoint with a date parameter"""
+def report_with_date(result, test_date):
+    """Report the prediction endpoint with a date parameter"""
     try:
-        test_date = "2024-10-25"
-        url = f"http://localhost:8000/predict/Bitcoin?date={test_date}"
-        
         print(f"\n🔄 Testing prediction endpoint with date parameter: {test_date}")
-        print(f"🌐 URL: {url}")
+        print(f"🌐 URL: {result['url']}")
         
-        response = requests.get(url, timeout=30)
+        if 'error' in result:
+            raise result['error']
+        
+        response = result['response']
         
         if response.status_code == 200:
             data = response.json()
@@ -61,25 +79,37 @@ def test_prediction_with_date():
                 print(f"✅ Correctly used provided date: {test_date}")
             else:
                 print(f"⚠️ Expected provided date ({test_date}) but got: {data.get('input_date')}")
-                
+        
         else:
             print(f"❌ API returned status code: {response.status_code}")
             print(f"Response: {response.text}")
-            
+    
     except requests.RequestException as e:
         print(f"❌ Request failed: {e}")
     except Exception as e:
         print(f"❌ Error: {e}")
 
+def test_prediction_without_date():
+    """Test the prediction endpoint without providing a date"""
+    report_without_date(run_case({}))
+
+def test_prediction_with_date():
+    """Test the prediction endpoint with a date parameter"""
+    report_with_date(run_case({'date': TEST_DATE}), TEST_DATE)
+
 if __name__ == "__main__":
     print("🚀 Testing Bitcoin Price Prediction API with Optional Date Parameter")
     print("=" * 70)
     
-    # Test without date (should use today's date)
-    test_prediction_without_date()
+    # Without date (should use today's date) and with date (should use provided date)
+    cases = [{}, {'date': TEST_DATE}]
+    
+    # Send all requests concurrently, then report the results in order
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(run_case, cases))
     
-    # Test with date (should use provided date)
-    test_prediction_with_date()
+    report_without_date(results[0])
+    report_with_date(results[1], TEST_DATE)
     
     print("\n" + "=" * 70)
-    print("✅ Test completed!")
\ No newline at end of file
+    print("✅ Test completed!")
@@ -1,8 +1,56 @@
-import requests
+import requests_cache
+import numpy as np
+import orjson
 import pandas as pd
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timedelta
 import yfinance as yf
+from curl_cffi import requests as curl_requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+@st.cache_resource
+def _cg_session():
+    """
+    Shared CoinGecko session, kept for the lifetime of the app so repeated calls reuse
+    pooled keep-alive connections. Responses are also cached in the user cache directory:
+    past-dated history never changes, prices go stale after 5 minutes
+    """
+    session = requests_cache.CachedSession(
+        'coingecko_cache',
+        use_cache_dir=True,
+        expire_after=timedelta(days=365),
+        urls_expire_after={
+            'api.coingecko.com/api/v3/coins/*/history': requests_cache.NEVER_EXPIRE,
+            'api.coingecko.com/api/v3/simple/price': timedelta(minutes=5),
+        },
+        allowable_codes=[200]
+    )
+    session.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504],
+            # CoinGecko can ask for minutes-long Retry-After waits; use the short backoff instead of blocking
+            respect_retry_after_header=False
+        )
+    ))
+    return session
+
+# Shared Yahoo Finance session. yfinance only accepts curl_cffi sessions, which keep
+# connections alive and send browser-like headers through impersonation
+_YF_SESSION = curl_requests.Session(impersonate="chrome")
+
+# Ticker objects reused across periods, keyed by symbol
+_TICKERS = {}
+
+def get_ticker(yf_symbol):
+    """Return the cached yfinance Ticker for a symbol, creating it on first use"""
+    ticker = _TICKERS.get(yf_symbol)
+    if ticker is None:
+        ticker = yf.Ticker(yf_symbol, session=_YF_SESSION)
+        _TICKERS[yf_symbol] = ticker
+    return ticker
 
 # Define our main cryptocurrency
 MAIN_CRYPTOS = {
@@ -24,15 +72,16 @@ def get_crypto_data():
     try:
         url = "https://api.coingecko.com/api/v3/simple/price"
         params = {
-            'ids': 'bitcoin',
+            # One request for every tracked coin; CoinGecko accepts a comma-separated id list
+            'ids': ','.join(MAIN_CRYPTOS),
             'vs_currencies': 'usd',
             'include_24hr_change': 'true',
             'include_market_cap': 'true'
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = _cg_session().get(url, params=params, timeout=10)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
             for crypto_id, crypto_info in MAIN_CRYPTOS.items():
                 if crypto_id in data:
@@ -58,6 +107,13 @@ def get_crypto_data():
     
     return crypto_data
 
+def generate_sample_history(periods=30):
+    """Generate a sample daily Close series ending today"""
+    idx = np.arange(periods)
+    close = 100.0 + 2.0*idx + (idx % 3)*10.0
+    dates = pd.date_range(end=datetime.now(), periods=periods, freq='D')
+    return pd.DataFrame({'Close': close}, index=dates)
+
 @st.cache_data(ttl=600)
 def get_price_history(yf_symbol, period="7d"):
     """Get price history using yfinance"""
@@ -67,23 +123,15 @@ def get_price_history(yf_symbol, period="7d"):
         yf_period = period_map.get(period, "7d")
         
         # Get data from yfinance
-        crypto = yf.Ticker(yf_symbol)
+        crypto = get_ticker(yf_symbol)
         hist = crypto.history(period=yf_period)
         
         if not hist.empty:
             return hist
         else:
             # Generate sample data if no real data available
-            dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
-            sample_data = pd.DataFrame({
-                'Close': [100 + i*2 + (i%3)*10 for i in range(30)]
-            }, index=dates)
-            return sample_data
+            return generate_sample_history()
             
     except:
         # Generate sample data as fallback
-        dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
-        sample_data = pd.DataFrame({
-            'Close': [100 + i*2 + (i%3)*10 for i in range(30)]
-        }, index=dates)
-        return sample_data
\ No newline at end of file
+        return generate_sample_history()
\ No newline at end of file
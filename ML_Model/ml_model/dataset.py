@@ -1,16 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
 from pathlib import Path
 
+import shutil
 import zipfile
 import requests
 
 from loguru import logger
 from tqdm import tqdm
+from tqdm.utils import CallbackIOWrapper
 import typer
 
 from ml_model.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
 
+# Optional (install the "download" extra): gdown handles the Google Drive confirmation
+# flow and can resume partial downloads. Without it the dataset is fetched with requests
+try:
+    import gdown
+except ModuleNotFoundError:
+    gdown = None
+
 app = typer.Typer()
 
+# Copy the download in 1 MiB blocks to keep per-chunk Python overhead low
+CHUNK_SIZE = 1 << 20
+
+
+def download_with_requests(download_url: str, zip_file_path: Path):
+    """Download a file with a progress bar, streaming the raw socket straight to disk"""
+    with requests.get(download_url, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        
+        total_size = int(response.headers.get('content-length', 0))
+        with open(zip_file_path, 'wb') as file, tqdm(
+            desc="Downloading",
+            total=total_size,
+            unit='B',
+            unit_scale=True,
+            unit_divisor=1024,
+        ) as progress_bar:
+            # Reserve the whole file up front so the filesystem does not keep extending it
+            if total_size > 0 and hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(file.fileno(), 0, total_size)
+            
+            wrapped_file = CallbackIOWrapper(progress_bar.update, file, "write")
+            shutil.copyfileobj(response.raw, wrapped_file, length=CHUNK_SIZE)
+            
+            # Drop any preallocated tail if the decoded body was shorter than Content-Length
+            file.truncate()
+
+
+def file_sha256(path: Path) -> str:
+    """Compute the SHA-256 hex digest of a file"""
+    with open(path, 'rb') as file:
+        return hashlib.file_digest(file, 'sha256').hexdigest()
+
+
+def _extract_members(zip_file_path: Path, names: list, target_dir: Path):
+    """Extract a batch of zip members using this thread's own ZipFile handle"""
+    target_root = target_dir.resolve()
+    with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+        for name in names:
+            # Refuse members that would land outside the target directory
+            target = (target_root / name).resolve()
+            if target != target_root and target_root not in target.parents:
+                raise zipfile.BadZipFile(f"Unsafe path in zip file: {name}")
+            
+            if name.endswith('/'):
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with zip_ref.open(name) as source, open(target, 'wb', buffering=CHUNK_SIZE) as dest:
+                shutil.copyfileobj(source, dest, length=CHUNK_SIZE)
+
+
+def extract_zip(zip_file_path: Path, target_dir: Path):
+    """Extract a zip file in parallel, splitting its members across worker threads"""
+    with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+        names = zip_ref.namelist()
+    
+    workers = max(1, min(os.cpu_count() or 1, len(names)))
+    batches = [names[i::workers] for i in range(workers)]
+    
+    # zlib releases the GIL while decompressing, so threads extract members concurrently
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda batch: _extract_members(zip_file_path, batch, target_dir), batches))
+
 
 @app.command()
 def main(
@@ -28,49 +106,51 @@ def main(
     google_drive_id = "1FLaTRGOXZ1Nz3H7npW2Sq5c4vzgEt3aE"
     download_url = f"https://drive.google.com/uc?export=download&id={google_drive_id}"
     zip_file_path = RAW_DATA_DIR / "dataset.zip"
+    # Sidecar with the hash of a fully downloaded zip, and a marker written once it is extracted
+    checksum_path = RAW_DATA_DIR / "dataset.zip.sha256"
+    extracted_marker = RAW_DATA_DIR / ".dataset_extracted"
     
-    logger.info("Downloading dataset from Google Drive...")
-    
-    try:
-        # Download the file with progress bar
-        response = requests.get(download_url, stream=True)
-        response.raise_for_status()
-        
-        total_size = int(response.headers.get('content-length', 0))
-        with open(zip_file_path, 'wb') as file, tqdm(
-            desc="Downloading",
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as progress_bar:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    file.write(chunk)
-                    progress_bar.update(len(chunk))
-        
-        logger.info(f"Downloaded dataset to: {zip_file_path}")
-        
-        # Extract the zip file
-        logger.info("Extracting zip file...")
-        with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-            zip_ref.extractall(RAW_DATA_DIR)
-        
-        logger.success(f"Dataset extracted to: {RAW_DATA_DIR}")
-        
-        # Optionally remove the zip file after extraction
-        zip_file_path.unlink()
-        logger.info("Removed zip file after extraction")
-        
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error downloading file: {e}")
-        raise
-    except zipfile.BadZipFile as e:
-        logger.error(f"Error extracting zip file: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        raise
+    if extracted_marker.exists():
+        logger.info(f"Dataset already extracted to {RAW_DATA_DIR}, skipping download "
+                    f"(delete {extracted_marker} to fetch it again)")
+    else:
+        try:
+            if (zip_file_path.exists() and checksum_path.exists()
+                    and file_sha256(zip_file_path) == checksum_path.read_text().strip()):
+                logger.info(f"Verified existing download at {zip_file_path}, skipping download")
+            else:
+                logger.info("Downloading dataset from Google Drive...")
+                
+                if gdown is not None:
+                    gdown.download(id=google_drive_id, output=str(zip_file_path), quiet=False, resume=True)
+                else:
+                    logger.warning("gdown not installed, downloading with requests")
+                    download_with_requests(download_url, zip_file_path)
+                
+                checksum_path.write_text(file_sha256(zip_file_path))
+                logger.info(f"Downloaded dataset to: {zip_file_path}")
+            
+            # Extract the zip file
+            logger.info("Extracting zip file...")
+            extract_zip(zip_file_path, RAW_DATA_DIR)
+            extracted_marker.write_text(checksum_path.read_text())
+            
+            logger.success(f"Dataset extracted to: {RAW_DATA_DIR}")
+            
+            # Optionally remove the zip file after extraction
+            zip_file_path.unlink()
+            checksum_path.unlink()
+            logger.info("Removed zip file after extraction")
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error downloading file: {e}")
+            raise
+        except zipfile.BadZipFile as e:
+            logger.error(f"Error extracting zip file: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+            raise
     
     # ---- REPLACE THIS WITH YOUR OWN CODE ----
     logger.info("Processing dataset...")